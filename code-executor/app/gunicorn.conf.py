@@ -0,0 +1,10 @@
+"""Gunicorn configuration for the code executor."""
+import multiprocessing
+import os
+
+bind = "0.0.0.0:8002"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Keep client connections open well past the 2s default
+keepalive = 75
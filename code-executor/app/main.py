@@ -5,6 +5,7 @@ from fastapi_mcp import FastApiMCP
 import httpx
 import logging
 import sys
+from typing import Optional
 
 # Configure logging
 logging.basicConfig(
@@ -18,6 +19,9 @@ app = FastAPI(title="Code Execution MCP Client")
 
 SANDBOX_URL = "http://sandbox:8001"
 
+# Shared pooled client for sandbox requests, created on startup
+CLIENT: Optional[httpx.AsyncClient] = None
+
 class CodeRequest(BaseModel):
     code: str
 
@@ -33,14 +37,10 @@ async def execute_code(request: CodeRequest) -> dict:
         Dict containing execution results or error information
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{SANDBOX_URL}/execute",
-                json={"code": request.code}
-            )
-            response.raise_for_status()
-            return response.json()
-            
+        response = await CLIENT.post("/execute", json={"code": request.code})
+        response.raise_for_status()
+        return response.json()
+
     except Exception as e:
         logger.error(f"Error forwarding code execution: {str(e)}")
         return {
@@ -48,6 +48,22 @@ async def execute_code(request: CodeRequest) -> dict:
             "error": str(e)
         }
 
+@app.on_event("startup")
+async def startup_event():
+    """Create the pooled sandbox client."""
+    global CLIENT
+    CLIENT = httpx.AsyncClient(
+        base_url=SANDBOX_URL,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        timeout=httpx.Timeout(30.0)
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the pooled sandbox client."""
+    if CLIENT is not None:
+        await CLIENT.aclose()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
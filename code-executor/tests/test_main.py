@@ -0,0 +1,34 @@
+"""Tests for the code-executor sandbox forwarding."""
+import sys
+from pathlib import Path
+
+import httpx
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+import main  # noqa: E402
+
+
+def test_client_lifecycle():
+    """The pooled client is created on startup and closed on shutdown."""
+    with TestClient(main.app):
+        client = main.CLIENT
+        assert client is not None
+        assert not client.is_closed
+    assert client.is_closed
+
+
+def test_execute_code_uses_pooled_client():
+    """Code requests are forwarded to the sandbox through the shared client."""
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.method, str(request.url), request.content))
+        return httpx.Response(200, json={"status": "success", "result": {}})
+
+    with TestClient(main.app) as test_client:
+        main.CLIENT = httpx.AsyncClient(base_url=main.SANDBOX_URL, transport=httpx.MockTransport(handler))
+        response = test_client.post("/execute-code", json={"code": "x = 1"})
+
+    assert response.json() == {"status": "success", "result": {}}
+    assert seen == [("POST", f"{main.SANDBOX_URL}/execute", b'{"code":"x = 1"}')]
@@ -0,0 +1,25 @@
+"""Gunicorn configuration for the MCP server."""
+import multiprocessing
+import os
+import shutil
+
+bind = "0.0.0.0:8000"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Keep client connections open well past the 2s default
+keepalive = 75
+
+# Each worker records its metrics to files in this directory so /metrics can aggregate them
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus")
+
+def on_starting(server):
+    """Start with an empty metrics directory."""
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+def child_exit(server, worker):
+    """Drop the live metrics of a worker that exited."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
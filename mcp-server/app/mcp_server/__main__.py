@@ -2,6 +2,7 @@
 import asyncio
 import sys
 import uvicorn
+import uvloop
 from .server import app, initialize_server
 
 async def run_stdio_server():
@@ -14,20 +15,23 @@ async def run_stdio_server():
 
 async def run_servers():
     """Run both stdio and FastAPI servers."""
-    # Start the stdio server
-    stdio_task = asyncio.create_task(run_stdio_server())
-    
-    # Start the FastAPI server
-    config = uvicorn.Config(app, host="0.0.0.0", port=8000, log_level="info")
+    config = uvicorn.Config(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        http="httptools",
+        log_level="info",
+        access_log=False
+    )
     server = uvicorn.Server(config)
-    await server.serve()
     
-    # Wait for stdio server
-    await stdio_task
+    # Run the stdio and FastAPI servers side by side
+    await asyncio.gather(run_stdio_server(), server.serve())
 
 def main():
     """Main entry point."""
-    asyncio.run(run_servers())
+    # uvicorn only installs its loop in Server.run(), so start serve() on uvloop here
+    uvloop.run(run_servers())
 
 if __name__ == "__main__":
     main()
@@ -1,13 +1,20 @@
 """MCP server implementation - central aggregator for multiple MCP services."""
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from fastapi_mcp import FastApiMCP
 from datetime import datetime
 import logging
 import prometheus_client
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Histogram, multiprocess
+from mcp.server.stdio import stdio_server
 import httpx
-from typing import Dict, List, Any
+import orjson
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable
+from functools import partial
 import asyncio
+import os
+import time
 from .config import config
 
 # Setup logging
@@ -26,11 +33,43 @@ tool_execution_count = Counter(
     ['tool_name', 'status']
 )
 
+# Under Gunicorn each worker writes its own metrics, so collect them from all workers
+if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+    metrics_registry = prometheus_client.CollectorRegistry()
+    multiprocess.MultiProcessCollector(metrics_registry)
+else:
+    metrics_registry = prometheus_client.REGISTRY
+
+# Labelled metric children, cached so the hot path skips label resolution
+_hist_cache: Dict[str, Any] = {}
+_ctr_cache: Dict[Tuple[str, str], Any] = {}
+
+def _tool_timer(tool_name: str):
+    """Get the execution time histogram for a tool."""
+    histogram = _hist_cache.get(tool_name)
+    if histogram is None:
+        histogram = _hist_cache[tool_name] = tool_execution_time.labels(tool_name=tool_name)
+    return histogram
+
+def _tool_counter(tool_name: str, status: str):
+    """Get the execution counter for a tool and status."""
+    counter = _ctr_cache.get((tool_name, status))
+    if counter is None:
+        counter = _ctr_cache[(tool_name, status)] = tool_execution_count.labels(tool_name=tool_name, status=status)
+    return counter
+
 # Initialize FastAPI app
-app = FastAPI(title="MCP Server - Central Aggregator")
+# No interactive docs, so unmatched requests don't walk extra routes
+app = FastAPI(
+    title="MCP Server - Central Aggregator",
+    default_response_class=ORJSONResponse,
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None
+)
 
-# Initialize FastAPI-MCP
-mcp = FastApiMCP(app)
+# Initialize FastAPI-MCP, keeping admin endpoints out of the tool list
+mcp = FastApiMCP(app, exclude_operations=["refresh_tools"])
 
 # Service registry - map of service_name -> service_url
 SERVICES = {
@@ -44,102 +83,334 @@ tool_registry = {}
 # Available tools cache
 available_tools_cache = {}
 
-async def discover_service_tools(service_name: str, service_url: str) -> List[str]:
-    """Discover available tools from a service."""
+# Endpoint that last served each tool - map of tool_name -> endpoint url
+endpoint_cache: Dict[str, str] = {}
+
+# Tool dispatcher - called with (tool_name, payload), returns the result or None on failure
+Dispatcher = Callable[[str, Dict[str, Any]], Awaitable[Optional[Any]]]
+
+# Dispatchers for tools with fixed endpoints - map of tool_name -> dispatcher, built on startup
+_known_dispatch: Dict[str, Dispatcher] = {}
+
+# Dispatch table - map of tool_name -> dispatcher bound to the endpoint serving it
+DISPATCH: Dict[str, Dispatcher] = {}
+
+# Upper bound on health check + discovery for a single service
+SERVICE_REFRESH_TIMEOUT = 15.0
+
+# Seconds between background tool discovery runs
+TOOL_REFRESH_INTERVAL = 30.0
+
+# Probe timestamp cache - (epoch second, ISO string)
+_ts_cache = (0, "")
+
+# Shared pooled client for all service requests, created on startup
+HTTP: Optional[httpx.AsyncClient] = None
+
+# Background tool discovery task, started on startup
+_refresh_task: Optional[asyncio.Task] = None
+
+def _tool_endpoints(service_url: str, tool_name: str) -> List[str]:
+    """Candidate POST endpoints for a tool, in the order they are tried."""
+    return [
+        f"{service_url}/mcp/tools/{tool_name}",
+        f"{service_url}/tools/{tool_name}",
+        f"{service_url}/{tool_name}",
+        f"{service_url}/execute"  # For services that use generic execute endpoint
+    ]
+
+async def discover_service_tools(service_name: str, service_url: str) -> Tuple[List[str], Optional[str]]:
+    """Discover available tools from a service.
+    
+    Returns the tool names and the endpoint that listed them, or None if the
+    tools were inferred rather than discovered.
+    """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # Try different possible endpoints to get tools
-            endpoints_to_try = [
-                f"{service_url}/tools",
-                f"{service_url}/mcp/tools", 
-                f"{service_url}/api/tools"
-            ]
-            
-            for endpoint in endpoints_to_try:
-                try:
-                    response = await client.get(endpoint)
-                    if response.status_code == 200:
-                        tools = response.json()
-                        if isinstance(tools, list):
-                            logger.info(f"Discovered {len(tools)} tools from {service_name}: {tools}")
-                            return tools
-                        elif isinstance(tools, dict) and 'tools' in tools:
-                            tool_list = tools['tools']
-                            logger.info(f"Discovered {len(tool_list)} tools from {service_name}: {tool_list}")
-                            return tool_list
-                except Exception as e:
-                    logger.debug(f"Failed to get tools from {endpoint}: {e}")
-                    continue
-            
-            # If no tools endpoint found, try to infer from FastAPI-MCP endpoints
-            # For time-client, we know it has get_current_time
-            # For code-executor, we know it has execute_python
-            if "time-client" in service_name:
-                logger.info(f"Using known tools for {service_name}: ['get_current_time']")
-                return ["get_current_time"]
-            elif "code-executor" in service_name:
-                logger.info(f"Using known tools for {service_name}: ['execute_python']")
-                return ["execute_python"]
-            
-            logger.warning(f"No tools discovered for {service_name}")
-            return []
-            
+        # Try different possible endpoints to get tools
+        endpoints_to_try = [
+            f"{service_url}/tools",
+            f"{service_url}/mcp/tools", 
+            f"{service_url}/api/tools"
+        ]
+        
+        for endpoint in endpoints_to_try:
+            try:
+                response = await HTTP.get(endpoint, timeout=10.0)
+                if response.status_code == 200:
+                    tools = orjson.loads(response.content)
+                    if isinstance(tools, list):
+                        logger.info(f"Discovered {len(tools)} tools from {service_name}: {tools}")
+                        return tools, endpoint
+                    elif isinstance(tools, dict) and 'tools' in tools:
+                        tool_list = tools['tools']
+                        logger.info(f"Discovered {len(tool_list)} tools from {service_name}: {tool_list}")
+                        return tool_list, endpoint
+            except Exception as e:
+                logger.debug(f"Failed to get tools from {endpoint}: {e}")
+                continue
+        
+        # If no tools endpoint found, try to infer from FastAPI-MCP endpoints
+        # For time-client, we know it has get_current_time
+        # For code-executor, we know it has execute_python
+        if "time-client" in service_name:
+            logger.info(f"Using known tools for {service_name}: ['get_current_time']")
+            return ["get_current_time"], None
+        elif "code-executor" in service_name:
+            logger.info(f"Using known tools for {service_name}: ['execute_python']")
+            return ["execute_python"], None
+        
+        logger.warning(f"No tools discovered for {service_name}")
+        return [], None
+        
     except Exception as e:
         logger.error(f"Failed to discover tools from {service_name} at {service_url}: {e}")
-        return []
+        return [], None
+
+async def _refresh_one(service_name: str, service_url: str) -> List[tuple]:
+    """Check a service's health and discover its tools.
+
+    Returns a list of (tool, service_name, service_url, tools_endpoint) entries.
+    """
+    async def _discover() -> List[tuple]:
+        # Check if service is healthy first
+        health_response = await HTTP.get(f"{service_url}/health", timeout=5.0)
+        if health_response.status_code != 200:
+            logger.warning(f"Service {service_name} is not healthy")
+            return []
+        
+        # Discover tools from this service
+        tools, tools_endpoint = await discover_service_tools(service_name, service_url)
+        return [(tool, service_name, service_url, tools_endpoint) for tool in tools]
+    
+    return await asyncio.wait_for(_discover(), timeout=SERVICE_REFRESH_TIMEOUT)
 
 async def refresh_tool_registry():
     """Refresh the tool registry by discovering tools from all services."""
     global tool_registry, available_tools_cache
     
+    # Query all services concurrently
+    results = await asyncio.gather(
+        *[_refresh_one(name, url) for name, url in SERVICES.items()],
+        return_exceptions=True
+    )
+    
     tool_registry.clear()
     available_tools_cache.clear()
+    previous_endpoints = dict(endpoint_cache)
+    endpoint_cache.clear()
     
-    for service_name, service_url in SERVICES.items():
-        try:
-            # Check if service is healthy first
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                health_response = await client.get(f"{service_url}/health")
-                if health_response.status_code != 200:
-                    logger.warning(f"Service {service_name} is not healthy")
-                    continue
-            
-            # Discover tools from this service
-            tools = await discover_service_tools(service_name, service_url)
+    for service_name, result in zip(SERVICES, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Failed to refresh tools for {service_name}: {result!r}")
+            continue
+        
+        # Register tools
+        for tool, tool_service, service_url, tools_endpoint in result:
+            tool_registry[tool] = tool_service
+            available_tools_cache[tool] = {
+                "name": tool,
+                "service": tool_service,
+                "url": service_url
+            }
             
-            # Register tools
-            for tool in tools:
-                tool_registry[tool] = service_name
-                available_tools_cache[tool] = {
-                    "name": tool,
-                    "service": service_name,
-                    "url": service_url
-                }
-                
-        except Exception as e:
-            logger.error(f"Failed to refresh tools for {service_name}: {e}")
+            # Keep endpoints that already worked for tools still served by the same service,
+            # otherwise seed from the tools listing if it matches a standard endpoint
+            candidates = _tool_endpoints(service_url, tool)
+            if previous_endpoints.get(tool) in candidates:
+                endpoint_cache[tool] = previous_endpoints[tool]
+            elif tools_endpoint and f"{tools_endpoint}/{tool}" in candidates:
+                endpoint_cache[tool] = f"{tools_endpoint}/{tool}"
+    
+    # Bind dispatchers for the registered tools, unknown endpoints are probed on first use
+    DISPATCH.clear()
+    for tool in tool_registry:
+        if tool in _known_dispatch:
+            DISPATCH[tool] = _known_dispatch[tool]
+        elif tool in endpoint_cache:
+            DISPATCH[tool] = partial(_dispatch_post, endpoint_cache[tool])
     
     logger.info(f"Tool registry updated: {tool_registry}")
 
+async def _probe_endpoints(tool_name: str, endpoints: List[str]) -> List[str]:
+    """Return the candidate endpoints that exist on the service, in their original order.
+    
+    Probes use OPTIONS, which never runs the tool, so all candidates can be checked
+    concurrently. A 404 or a failed request means the route is not there.
+    """
+    async def _probe(endpoint: str) -> bool:
+        try:
+            response = await HTTP.options(endpoint, timeout=5.0)
+            return response.status_code != 404
+        except httpx.HTTPError as e:
+            logger.debug(f"Failed to probe {endpoint} for {tool_name}: {e}")
+            return False
+    
+    found = await asyncio.gather(*[_probe(endpoint) for endpoint in endpoints])
+    return [endpoint for endpoint, exists in zip(endpoints, found) if exists]
+
+async def _stream_post(endpoint: str, payload: Dict[str, Any]) -> httpx.Response:
+    """POST the payload without reading the response body.
+
+    The caller owns the response and must close it.
+    """
+    return await HTTP.send(HTTP.build_request("POST", endpoint, json=payload), stream=True)
+
+async def _log_failure(endpoint: str, response: httpx.Response):
+    """Log a failed tool response and release its connection."""
+    await response.aread()
+    await response.aclose()
+    logger.error(f"Tool execution failed at {endpoint}: {response.status_code} - {response.text}")
+
+async def _post_first_success(tool_name: str, endpoints: List[str], payload: Dict[str, Any]) -> Optional[Tuple[str, httpx.Response]]:
+    """POST the payload to the first candidate endpoint that accepts it.
+    
+    Tool calls have side effects, so the payload is only sent to one endpoint at a
+    time, in the order given. Candidates are filtered with a concurrent probe first,
+    and the next one is only tried if the previous one turned out not to exist.
+    
+    Returns (endpoint, response) for the first 200 response, with its body still
+    unread, or None if no endpoint succeeded.
+    """
+    for endpoint in await _probe_endpoints(tool_name, endpoints):
+        try:
+            response = await _stream_post(endpoint, payload)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            # The request never reached the service, safe to try the next endpoint
+            logger.debug(f"Failed to execute {tool_name} at {endpoint}: {e}")
+            continue
+        
+        if response.status_code == 200:
+            return endpoint, response
+        if response.status_code == 404:
+            await response.aclose()
+            continue  # Try next endpoint
+        
+        # The endpoint handled the request, don't run the tool again elsewhere
+        await _log_failure(endpoint, response)
+        return None
+    return None
+
+def _forward(tool_name: str, endpoint: str, response: httpx.Response) -> StreamingResponse:
+    """Stream a successful upstream response through as-is."""
+    logger.info(f"Successfully executed {tool_name} via {endpoint}")
+    # Stream the upstream body instead of buffering and re-encoding it
+    return StreamingResponse(
+        response.aiter_bytes(),
+        status_code=response.status_code,
+        media_type=response.headers.get("content-type", "application/json"),
+        background=BackgroundTask(response.aclose)
+    )
+
+async def _dispatch_probe(tool_name: str, payload: Dict[str, Any]) -> Optional[StreamingResponse]:
+    """Find the endpoint serving a tool and register a dispatcher for next time."""
+    service_url = SERVICES[tool_registry[tool_name]]
+    success = await _post_first_success(tool_name, _tool_endpoints(service_url, tool_name), payload)
+    if success is None:
+        return None
+    
+    endpoint, response = success
+    endpoint_cache[tool_name] = endpoint
+    DISPATCH[tool_name] = partial(_dispatch_post, endpoint)
+    return _forward(tool_name, endpoint, response)
+
+async def _dispatch_post(endpoint: str, tool_name: str, payload: Dict[str, Any]) -> Optional[StreamingResponse]:
+    """POST a tool call to its endpoint, probing again if the endpoint went away."""
+    try:
+        response = await _stream_post(endpoint, payload)
+    except (httpx.ReadTimeout, httpx.WriteTimeout):
+        # The service may already be running the tool, don't send it again
+        raise
+    except httpx.HTTPError as e:
+        logger.debug(f"Endpoint {endpoint} for {tool_name} failed: {e}")
+        response = None
+    
+    if response is None or response.status_code == 404:
+        # Endpoint went away, invalidate it and probe again
+        if response is not None:
+            await response.aclose()
+        endpoint_cache.pop(tool_name, None)
+        DISPATCH.pop(tool_name, None)
+        return await _dispatch_probe(tool_name, payload)
+    
+    if response.status_code != 200:
+        await _log_failure(endpoint, response)
+        return None
+    return _forward(tool_name, endpoint, response)
+
+async def _dispatch_get(url: str, tool_name: str, payload: Dict[str, Any]) -> Optional[Any]:
+    """GET a tool whose endpoint returns a JSON string, falling back to the POST endpoints."""
+    try:
+        response = await HTTP.get(url)
+        if response.status_code == 200:
+            logger.info(f"Successfully executed {tool_name} via GET {url}")
+            return {"success": True, "output": orjson.loads(response.content)}
+        logger.error(f"GET {url} failed: {response.status_code} - {response.text}")
+    except Exception as e:
+        logger.error(f"Failed to execute {tool_name} via GET: {e}")
+    return await _dispatch_probe(tool_name, payload)
+
+async def _periodic_refresh():
+    """Rediscover tools in the background so requests never wait on discovery."""
+    while True:
+        await asyncio.sleep(TOOL_REFRESH_INTERVAL)
+        try:
+            await refresh_tool_registry()
+        except Exception as e:
+            logger.error(f"Background tool refresh failed: {e}")
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize tool discovery on startup."""
+    """Create the shared HTTP client and initialize tool discovery on startup."""
+    global HTTP, _refresh_task
+    HTTP = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+        timeout=httpx.Timeout(connect=5.0, read=30.0, write=5.0, pool=5.0)
+    )
+    endpoint_cache.clear()
+    _known_dispatch.clear()
+    if "time-client" in SERVICES:
+        # Time client uses GET /current-time
+        _known_dispatch["get_current_time"] = partial(_dispatch_get, f"{SERVICES['time-client']}/current-time")
+    if "code-executor" in SERVICES:
+        _known_dispatch["execute_python"] = partial(_dispatch_post, f"{SERVICES['code-executor']}/execute-code")
     await refresh_tool_registry()
+    
+    # Bind metric children for the known tools up front
+    for tool_name in tool_registry:
+        _tool_timer(tool_name)
+        _tool_counter(tool_name, "success")
+        _tool_counter(tool_name, "error")
+    
+    _refresh_task = asyncio.create_task(_periodic_refresh())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background discovery and close the shared HTTP client."""
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+    if HTTP is not None:
+        await HTTP.aclose()
 
 @app.get("/mcp/tools")
 async def get_available_tools():
     """Get list of all available tools from all services."""
-    if not available_tools_cache:
-        await refresh_tool_registry()
-    
+    return list(tool_registry.keys())
+
+@app.post("/mcp/refresh", operation_id="refresh_tools")
+async def refresh_tools():
+    """Drop cached tool endpoints and rediscover tools from all services."""
+    endpoint_cache.clear()
+    await refresh_tool_registry()
     return list(tool_registry.keys())
 
 @app.post("/mcp/tools/{tool_name}")
 async def execute_tool(tool_name: str, parameters: Dict[str, Any] = None):
     """Execute a tool by proxying to the appropriate service."""
-    if tool_name not in tool_registry:
-        await refresh_tool_registry()  # Try refreshing in case tools were added
-        
+    # New tools are picked up by the background refresh, not on the request path
     if tool_name not in tool_registry:
         raise HTTPException(
             status_code=404, 
@@ -147,76 +418,45 @@ async def execute_tool(tool_name: str, parameters: Dict[str, Any] = None):
         )
     
     service_name = tool_registry[tool_name]
-    service_url = SERVICES[service_name]
     
     try:
-        with tool_execution_time.labels(tool_name=tool_name).time():
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                
-                # Handle tool-specific endpoint patterns
-                if tool_name == "get_current_time":
-                    # Time client uses GET /current-time
-                    try:
-                        response = await client.get(f"{service_url}/current-time")
-                        if response.status_code == 200:
-                            tool_execution_count.labels(tool_name=tool_name, status="success").inc()
-                            result = response.text.strip('"')  # Remove quotes from JSON string response
-                            logger.info(f"Successfully executed {tool_name} via GET {service_url}/current-time")
-                            return {"success": True, "output": result}
-                        else:
-                            logger.error(f"GET {service_url}/current-time failed: {response.status_code} - {response.text}")
-                    except Exception as e:
-                        logger.error(f"Failed to execute {tool_name} via GET: {e}")
-                
-                # For other tools, try standard POST endpoints
-                endpoints_to_try = [
-                    f"{service_url}/mcp/tools/{tool_name}",
-                    f"{service_url}/tools/{tool_name}",
-                    f"{service_url}/{tool_name}",
-                    f"{service_url}/execute"  # For services that use generic execute endpoint
-                ]
-                
-                for endpoint in endpoints_to_try:
-                    try:
-                        if parameters:
-                            response = await client.post(endpoint, json=parameters)
-                        else:
-                            response = await client.post(endpoint, json={})
-                            
-                        if response.status_code == 200:
-                            tool_execution_count.labels(tool_name=tool_name, status="success").inc()
-                            result = response.json()
-                            logger.info(f"Successfully executed {tool_name} via {endpoint}")
-                            return result
-                        elif response.status_code == 404:
-                            continue  # Try next endpoint
-                        else:
-                            logger.error(f"Tool execution failed at {endpoint}: {response.status_code} - {response.text}")
-                            
-                    except Exception as e:
-                        logger.debug(f"Failed to execute {tool_name} at {endpoint}: {e}")
-                        continue
-                
-                # If all endpoints failed
-                tool_execution_count.labels(tool_name=tool_name, status="error").inc()
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Failed to execute {tool_name} on {service_name} - no working endpoints found"
-                )
-                
+        with _tool_timer(tool_name).time():
+            dispatch = DISPATCH.get(tool_name, _dispatch_probe)
+            result = await dispatch(tool_name, parameters or {})
+            if result is not None:
+                _tool_counter(tool_name, "success").inc()
+                return result
+            
+            # If all endpoints failed
+            _tool_counter(tool_name, "error").inc()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to execute {tool_name} on {service_name} - no working endpoints found"
+            )
+            
     except HTTPException:
         raise
     except Exception as e:
-        tool_execution_count.labels(tool_name=tool_name, status="error").inc()
+        _tool_counter(tool_name, "error").inc()
         logger.error(f"Error executing tool {tool_name}: {e}")
         raise HTTPException(status_code=500, detail=f"Tool execution failed: {str(e)}")
 
+def _last_check() -> str:
+    """Current time as an ISO string, formatted at most once per second."""
+    global _ts_cache
+    now = int(time.time())
+    ts_sec, ts_str = _ts_cache
+    if now != ts_sec:
+        ts_str = datetime.now().isoformat()
+        _ts_cache = (now, ts_str)
+    return ts_str
+
 @app.get("/health")
 async def health_check():
     """Basic health check endpoint."""
     return {
         "status": "healthy",
-        "last_check": datetime.now().isoformat()
+        "last_check": _last_check()
     }
 
 @app.get("/ready")
@@ -224,17 +464,26 @@ async def readiness_check():
     """Readiness probe endpoint."""
     return {
         "status": "ready",
-        "last_check": datetime.now().isoformat()
+        "last_check": _last_check()
     }
 
+async def initialize_server():
+    """Serve the aggregated MCP tools over stdio until the input stream closes."""
+    async with stdio_server() as (read_stream, write_stream):
+        await mcp.server.run(
+            read_stream,
+            write_stream,
+            mcp.server.create_initialization_options()
+        )
+
 @app.get("/metrics")
 async def metrics():
     """Prometheus metrics endpoint."""
-    from fastapi import Response
     return Response(
-        content=prometheus_client.generate_latest(),
+        content=prometheus_client.generate_latest(metrics_registry),
         media_type="text/plain; version=0.0.4; charset=utf-8"
     )
 
-# Mount the MCP server
-mcp.mount()
+# Mount the MCP server, skipping the extra routes when there are no tools to serve
+if mcp.tools:
+    mcp.mount()
@@ -0,0 +1,23 @@
+"""Tests for the MCP server configuration."""
+import sys
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+from mcp_server.config import Config  # noqa: E402
+
+
+def test_config_reads_prefixed_env(monkeypatch):
+    """Settings are read from MCP_-prefixed environment variables."""
+    monkeypatch.setenv("MCP_TIME_CLIENT_URL", "http://localhost:9001")
+    assert Config().time_client_url == "http://localhost:9001"
+
+
+def test_config_is_frozen():
+    """The settings instance can't be modified after loading."""
+    config = Config()
+    with pytest.raises(ValidationError):
+        config.time_client_url = "http://elsewhere"
+    assert hash(config) == hash(config)
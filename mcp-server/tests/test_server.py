@@ -0,0 +1,323 @@
+"""Tests for the MCP aggregator proxy."""
+import asyncio
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+import httpx
+import orjson
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+from mcp_server import server  # noqa: E402
+
+
+def test_client_lifecycle(monkeypatch):
+    """The shared client is created on startup and closed on shutdown."""
+    monkeypatch.setattr(server, "SERVICES", {})
+    with TestClient(server.app):
+        client = server.HTTP
+        assert client is not None
+        assert not client.is_closed
+    assert client.is_closed
+
+
+def test_background_refresh_lifecycle(monkeypatch):
+    """Tool discovery keeps running in the background until shutdown."""
+    monkeypatch.setattr(server, "SERVICES", {})
+    monkeypatch.setattr(server, "TOOL_REFRESH_INTERVAL", 0.01)
+    refreshes = []
+    refresh = server.refresh_tool_registry
+
+    async def counting_refresh():
+        refreshes.append(1)
+        await refresh()
+
+    monkeypatch.setattr(server, "refresh_tool_registry", counting_refresh)
+    with TestClient(server.app) as client:
+        deadline = time.monotonic() + 2
+        while len(refreshes) < 3 and time.monotonic() < deadline:
+            client.get("/mcp/tools")
+        task = server._refresh_task
+        assert len(refreshes) >= 3
+    assert task.cancelled()
+
+
+def test_unknown_tool_does_not_refresh(monkeypatch):
+    """An unknown tool is a 404 without rediscovering tools on the request path."""
+    monkeypatch.setattr(server, "tool_registry", {})
+
+    async def refresh():
+        raise AssertionError("refreshed on the request path")
+
+    monkeypatch.setattr(server, "refresh_tool_registry", refresh)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(server.execute_tool("missing", {}))
+    assert exc.value.status_code == 404
+
+
+def _mock_service(monkeypatch, routes, delays=None, unreachable=()):
+    """Point the shared client at a mock service.
+
+    routes maps URL -> POST status code; any other URL answers 404, and hosts
+    in unreachable fail to connect. Returns the list of URLs that received a POST.
+    """
+    posted = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        if request.url.host in unreachable:
+            raise httpx.ConnectError("unreachable", request=request)
+        await asyncio.sleep((delays or {}).get(url, 0))
+        if url not in routes:
+            return httpx.Response(404)
+        if request.method == "OPTIONS":
+            return httpx.Response(405)
+        posted.append(url)
+        return httpx.Response(routes[url], json={"success": True, "output": url})
+
+    monkeypatch.setattr(server, "HTTP", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return posted
+
+
+CANDIDATES = ["http://svc/mcp/tools/t", "http://svc/tools/t", "http://svc/t", "http://svc/execute"]
+
+
+def test_post_first_success_posts_once_in_order(monkeypatch):
+    """Only the first existing endpoint runs the tool, however fast the others answer."""
+    posted = _mock_service(
+        monkeypatch,
+        {"http://svc/tools/t": 200, "http://svc/execute": 200},
+        delays={"http://svc/tools/t": 0.05},
+    )
+
+    endpoint, response = asyncio.run(server._post_first_success("t", CANDIDATES, {}))
+
+    assert endpoint == "http://svc/tools/t"
+    assert response.json()["output"] == "http://svc/tools/t"
+    assert posted == ["http://svc/tools/t"]
+
+
+def test_post_first_success_stops_after_tool_error(monkeypatch):
+    """A failing tool is not re-run on the next candidate endpoint."""
+    posted = _mock_service(monkeypatch, {"http://svc/tools/t": 500, "http://svc/execute": 200})
+
+    assert asyncio.run(server._post_first_success("t", CANDIDATES, {})) is None
+    assert posted == ["http://svc/tools/t"]
+
+
+def test_post_first_success_no_endpoint(monkeypatch):
+    """None is returned when no candidate exists."""
+    posted = _mock_service(monkeypatch, {})
+
+    assert asyncio.run(server._post_first_success("t", CANDIDATES, {})) is None
+    assert posted == []
+
+
+def _execute(tool_name, arguments):
+    """Run execute_tool and read the streamed response body."""
+    async def run():
+        response = await server.execute_tool(tool_name, arguments)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        await response.background()
+        return response, body
+
+    return asyncio.run(run())
+
+
+def _register_tool(monkeypatch, cached=None):
+    """Register tool "t" on a mock service, optionally with a cached endpoint."""
+    monkeypatch.setattr(server, "SERVICES", {"svc": "http://svc"})
+    monkeypatch.setattr(server, "tool_registry", {"t": "svc"})
+    monkeypatch.setattr(server, "endpoint_cache", {"t": cached} if cached else {})
+    monkeypatch.setattr(server, "DISPATCH", {"t": partial(server._dispatch_post, cached)} if cached else {})
+
+
+def test_execute_tool_uses_cached_endpoint(monkeypatch):
+    """A cached endpoint is called directly without probing."""
+    _register_tool(monkeypatch, cached="http://svc/execute")
+    posted = _mock_service(monkeypatch, {"http://svc/tools/t": 200, "http://svc/execute": 200})
+
+    result = orjson.loads(_execute("t", {})[1])
+
+    assert result["output"] == "http://svc/execute"
+    assert posted == ["http://svc/execute"]
+
+
+def test_execute_tool_evicts_cached_endpoint_on_404(monkeypatch):
+    """A cached endpoint that went away is replaced by the probed one."""
+    _register_tool(monkeypatch, cached="http://svc/mcp/tools/t")
+    posted = _mock_service(monkeypatch, {"http://svc/tools/t": 200})
+
+    result = orjson.loads(_execute("t", {})[1])
+
+    assert result["output"] == "http://svc/tools/t"
+    assert posted == ["http://svc/tools/t"]
+    assert server.endpoint_cache == {"t": "http://svc/tools/t"}
+
+
+def test_execute_tool_evicts_cached_endpoint_on_connect_error(monkeypatch):
+    """A cached endpoint on an unreachable host is replaced by the probed one."""
+    _register_tool(monkeypatch, cached="http://gone/tools/t")
+    posted = _mock_service(monkeypatch, {"http://svc/tools/t": 200}, unreachable={"gone"})
+
+    asyncio.run(server.execute_tool("t", {}))
+
+    assert posted == ["http://svc/tools/t"]
+    assert server.endpoint_cache == {"t": "http://svc/tools/t"}
+
+
+def test_execute_tool_read_timeout_does_not_reprobe(monkeypatch):
+    """A timed out request is not sent again to other endpoints."""
+    _register_tool(monkeypatch, cached="http://svc/tools/t")
+    requests = []
+
+    async def slow(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, str(request.url)))
+        raise httpx.ReadTimeout("slow", request=request)
+
+    monkeypatch.setattr(server, "HTTP", httpx.AsyncClient(transport=httpx.MockTransport(slow)))
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(server.execute_tool("t", {}))
+
+    assert excinfo.value.status_code == 500
+    assert requests == [("POST", "http://svc/tools/t")]
+    assert server.endpoint_cache == {"t": "http://svc/tools/t"}
+
+
+def test_refresh_prunes_endpoint_cache(monkeypatch):
+    """Refreshing drops cached endpoints for removed tools and keeps proven ones."""
+    monkeypatch.setattr(server, "SERVICES", {"svc": "http://svc"})
+    monkeypatch.setattr(server, "endpoint_cache", {
+        "kept": "http://svc/execute",
+        "removed": "http://svc/tools/removed",
+    })
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/health":
+            return httpx.Response(200, json={"status": "healthy"})
+        if request.url.path == "/tools":
+            return httpx.Response(200, json=["kept", "new"])
+        return httpx.Response(404)
+
+    monkeypatch.setattr(server, "HTTP", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    asyncio.run(server.refresh_tool_registry())
+
+    assert server.endpoint_cache == {
+        "kept": "http://svc/execute",
+        "new": "http://svc/tools/new",
+    }
+
+
+def test_refresh_endpoint_is_not_an_mcp_tool():
+    """The admin refresh endpoint is not exposed to MCP clients."""
+    assert "refresh_tools" not in [tool.name for tool in server.mcp.tools]
+
+
+def test_metric_children_are_cached():
+    """Labelled metric children are resolved once per tool."""
+    assert server._tool_timer("cached_tool") is server._tool_timer("cached_tool")
+    assert server._tool_counter("cached_tool", "success") is server._tool_counter("cached_tool", "success")
+    assert server._tool_counter("cached_tool", "success") is not server._tool_counter("cached_tool", "error")
+
+
+def test_last_check_formatted_once_per_second(monkeypatch):
+    """Probe timestamps are reused within the same second."""
+    monkeypatch.setattr(server.time, "time", lambda: 1_700_000_000.2)
+    monkeypatch.setattr(server, "_ts_cache", (1_700_000_000, "cached"))
+    assert server._last_check() == "cached"
+
+    monkeypatch.setattr(server.time, "time", lambda: 1_700_000_001.0)
+    assert server._last_check() != "cached"
+    assert server._ts_cache[0] == 1_700_000_001
+
+
+def test_execute_tool_forwards_upstream_body(monkeypatch):
+    """The upstream response body is returned without being re-encoded."""
+    _register_tool(monkeypatch, cached="http://svc/tools/t")
+    body = b'{"success": true,  "output": "as-is"}'
+    monkeypatch.setattr(server, "HTTP", httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+    ))
+
+    response, streamed = _execute("t", {})
+
+    assert streamed == body
+    assert response.media_type == "application/json"
+
+
+def test_mcp_routes_only_mounted_with_tools():
+    """The MCP transport routes are only added when there are tools to expose."""
+    paths = {route.path for route in server.app.routes}
+    assert ("/mcp" in paths) == bool(server.mcp.tools)
+    assert "/docs" not in paths
+
+
+def test_time_tool_uses_direct_get(monkeypatch):
+    """The time tool is a single GET whose JSON string body becomes the output."""
+    monkeypatch.setattr(server, "SERVICES", {"time-client": "http://time"})
+    monkeypatch.setattr(server, "tool_registry", {"get_current_time": "time-client"})
+    monkeypatch.setattr(server, "DISPATCH", {
+        "get_current_time": partial(server._dispatch_get, "http://time/current-time")
+    })
+    requests = []
+
+    def handler(request):
+        requests.append((request.method, str(request.url)))
+        return httpx.Response(200, json='2025-01-01 12:00 "UTC"')
+
+    monkeypatch.setattr(server, "HTTP", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    result = asyncio.run(server.execute_tool("get_current_time", {}))
+
+    assert result == {"success": True, "output": '2025-01-01 12:00 "UTC"'}
+    assert requests == [("GET", "http://time/current-time")]
+
+
+def test_probed_endpoint_is_dispatched_directly(monkeypatch):
+    """A tool found by probing is registered so the next call skips the probe."""
+    _register_tool(monkeypatch)
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, str(request.url)))
+        if str(request.url) != "http://svc/tools/t":
+            return httpx.Response(404)
+        return httpx.Response(405 if request.method == "OPTIONS" else 200, json={"success": True})
+
+    monkeypatch.setattr(server, "HTTP", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    _execute("t", {})
+    requests.clear()
+    _execute("t", {})
+
+    assert requests == [("POST", "http://svc/tools/t")]
+    assert server.DISPATCH["t"].args == ("http://svc/tools/t",)
+
+
+def test_known_tools_dispatch_to_fixed_endpoints(monkeypatch):
+    """Startup binds the built-in tools to their service endpoints."""
+    monkeypatch.setattr(server, "SERVICES", {
+        "time-client": "http://time",
+        "code-executor": "http://code",
+    })
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/health":
+            return httpx.Response(200, json={"status": "healthy"})
+        return httpx.Response(404)
+
+    transport = httpx.MockTransport(handler)
+    monkeypatch.setattr(server.httpx, "AsyncClient", partial(httpx.AsyncClient, transport=transport))
+    with TestClient(server.app):
+        dispatch = dict(server.DISPATCH)
+
+    assert dispatch["get_current_time"].func is server._dispatch_get
+    assert dispatch["get_current_time"].args == ("http://time/current-time",)
+    assert dispatch["execute_python"].func is server._dispatch_post
+    assert dispatch["execute_python"].args == ("http://code/execute-code",)
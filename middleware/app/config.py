@@ -1,4 +1,4 @@
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 import os
 import logging
@@ -13,10 +13,12 @@ class LLMConfig(BaseSettings):
     api_key: str = Field(default="ollama")
     model_name: str = Field(default="llama3.1:latest")
 
-    class Config:
-        env_prefix = "LLM_"
-        env_file = "/app/.env"
-        env_file_encoding = "utf-8"
+    model_config = SettingsConfigDict(
+        env_prefix="LLM_",
+        env_file="/app/.env",
+        env_file_encoding="utf-8",
+        frozen=True
+    )
 
 # Create config instance
 logger.info("Loading configuration...")
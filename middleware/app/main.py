@@ -1,16 +1,20 @@
 """MCP middleware implementation."""
-import json
+import asyncio
+import functools
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from openai import OpenAI
+from openai import AsyncOpenAI
 from config import config
 import httpx
+import orjson
 import re
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 import os
+import time
 from pathlib import Path
 
 # Configure logging
@@ -18,7 +22,7 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
-app = FastAPI(title="MCP Middleware")
+app = FastAPI(title="MCP Middleware", default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -29,8 +33,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize OpenAI client
-client = OpenAI(
+# Initialize OpenAI client, async so LLM calls don't block the event loop
+client = AsyncOpenAI(
     base_url=config.base_url,
     api_key=config.api_key
 )
@@ -39,6 +43,16 @@ client = OpenAI(
 OLLAMA_API_URL = "http://ollama:11434"
 MCP_SERVER_URL = "http://mcp-server:8000"
 
+# Shared pooled client for MCP server and Ollama requests, created on startup
+http_client: Optional[httpx.AsyncClient] = None
+
+# Seconds to reuse the MCP server's tool list before fetching it again
+TOOLS_CACHE_TTL = 30.0
+
+# Cached tool list, refreshed by one request at a time
+_tools_cache = {"value": None, "expires": 0.0}
+_tools_lock = asyncio.Lock()
+
 # Default system prompt fallback
 DEFAULT_SYSTEM_PROMPT = """You are a helpful assistant that can use tools. When you need to use a tool, wrap your request in <tool_request> tags with JSON format.
 
@@ -48,6 +62,9 @@ Available tools:
 
 Usage: <tool_request>{"name": "tool_name", "parameters": {...}}</tool_request>"""
 
+# Tool request tags in LLM responses
+_TOOL_REQUEST_RE = re.compile(r"<tool_request>(.*?)</tool_request>", re.DOTALL)
+
 def load_system_prompt() -> str:
     """Load system prompt from file with fallback to default."""
     try:
@@ -61,6 +78,9 @@ def load_system_prompt() -> str:
         logger.error(f"Error reading system_prompt.md: {e}, using default prompt")
         return DEFAULT_SYSTEM_PROMPT
 
+# Loaded once at import so chat requests don't read the file
+SYSTEM_PROMPT = load_system_prompt()
+
 # Service health status
 health_state = {
     "mcp_server": {"status": "unknown", "last_check": None},
@@ -82,62 +102,118 @@ class ChatResponse(BaseModel):
 
 class ToolRequest(BaseModel):
     name: str
-    parameters: Dict[str, Any]
+    parameters: Dict[str, Any] = {}
 
 class ServiceHealth(BaseModel):
     status: str
-    last_check: Optional[datetime]
+    last_check: Optional[float]  # Epoch seconds
+
+@app.on_event("startup")
+async def startup_event():
+    """Create the shared HTTP client."""
+    global http_client
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0),
+        timeout=httpx.Timeout(connect=2.0, read=10.0, write=5.0, pool=1.0)
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the shared HTTP client and the LLM client."""
+    if http_client is not None:
+        await http_client.aclose()
+    await client.close()
 
 async def check_service_health() -> Dict[str, ServiceHealth]:
     """Check health of all services."""
-    async with httpx.AsyncClient() as client:
-        # Check MCP Server
-        try:
-            response = await client.get(f"{MCP_SERVER_URL}/health")
-            health_state["mcp_server"] = {
-                "status": "healthy" if response.status_code == 200 else "unhealthy",
-                "last_check": datetime.now()
-            }
-        except Exception as e:
-            health_state["mcp_server"] = {
-                "status": "unhealthy",
-                "last_check": datetime.now()
-            }
-
-        # Check Ollama
-        try:
-            ollama_response = await client.get(f"{OLLAMA_API_URL}/api/version")
-            health_state["ollama"] = {
-                "status": "healthy" if ollama_response.status_code == 200 else "unhealthy",
-                "last_check": datetime.now()
-            }
-        except Exception as e:
-            health_state["ollama"] = {
-                "status": "unhealthy",
-                "last_check": datetime.now()
-            }
+    async def _probe_mcp():
+        return await http_client.get(f"{MCP_SERVER_URL}/health")
+
+    async def _probe_ollama():
+        return await http_client.get(f"{OLLAMA_API_URL}/api/version")
+
+    # Probe MCP Server and Ollama at the same time
+    results = await asyncio.gather(_probe_mcp(), _probe_ollama(), return_exceptions=True)
+    checked = time.time()
+
+    for service, result in zip(("mcp_server", "ollama"), results):
+        healthy = not isinstance(result, BaseException) and result.status_code == 200
+        health_state[service] = {
+            "status": "healthy" if healthy else "unhealthy",
+            "last_check": checked
+        }
 
     return health_state
 
-async def get_available_tools() -> List[str]:
-    """Get list of available tools from MCP server."""
+async def _fetch_available_tools() -> List[str]:
+    """Fetch the list of available tools from MCP server."""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{MCP_SERVER_URL}/mcp/tools")
-            if response.status_code != 200:
-                raise HTTPException(status_code=500, detail="Failed to get tools from MCP server")
-            return response.json()
+        response = await http_client.get(f"{MCP_SERVER_URL}/mcp/tools")
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail="Failed to get tools from MCP server")
+        return orjson.loads(response.content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get tools: {str(e)}")
 
-async def extract_tool_request(text: str) -> Optional[ToolRequest]:
+async def get_available_tools() -> List[str]:
+    """Get list of available tools from MCP server, cached for TOOLS_CACHE_TTL seconds."""
+    if _tools_cache["value"] is not None and time.monotonic() < _tools_cache["expires"]:
+        return _tools_cache["value"]
+
+    async with _tools_lock:
+        # Another request may have refreshed the list while this one waited
+        if _tools_cache["value"] is not None and time.monotonic() < _tools_cache["expires"]:
+            return _tools_cache["value"]
+        tools = await _fetch_available_tools()
+        _tools_cache["value"] = tools
+        _tools_cache["expires"] = time.monotonic() + TOOLS_CACHE_TTL
+        return tools
+
+def ttl_cache(seconds: float):
+    """Cache the result of a no-argument coroutine for the given number of seconds.
+    
+    Concurrent callers share one refresh when the cached value has expired.
+    """
+    def decorator(func):
+        cache = {"value": None, "expires": 0.0}
+        lock = asyncio.Lock()
+
+        @functools.wraps(func)
+        async def wrapper():
+            if time.monotonic() < cache["expires"]:
+                return cache["value"]
+            async with lock:
+                if time.monotonic() < cache["expires"]:
+                    return cache["value"]
+                cache["value"] = await func()
+                cache["expires"] = time.monotonic() + seconds
+                return cache["value"]
+
+        def cache_clear():
+            cache["expires"] = 0.0
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+def invalidate_tools_cache():
+    """Fetch the tool list again on next use."""
+    _tools_cache["expires"] = 0.0
+
+def parse_tool_request(raw: str) -> ToolRequest:
+    """Parse the JSON body of a tool request tag.
+
+    Raises ValueError if it isn't valid JSON or not a valid tool request.
+    """
+    return ToolRequest.model_validate_json(raw)
+
+def extract_tool_request(text: str) -> Optional[ToolRequest]:
     """Extract tool request from Llama's response."""
-    pattern = r"<tool_request>(.*?)</tool_request>"
-    match = re.search(pattern, text, re.DOTALL)
+    match = _TOOL_REQUEST_RE.search(text)
     if match:
         try:
-            return ToolRequest(**json.loads(match.group(1)))
-        except json.JSONDecodeError:
+            return parse_tool_request(match.group(1))
+        except ValueError:
             return None
     return None
 
@@ -145,6 +221,10 @@ async def call_mcp_tool(tool_request: ToolRequest) -> Dict[str, Any]:
     """Call the MCP server with the tool request."""
     # Verify tool exists
     available_tools = await get_available_tools()
+    if tool_request.name not in available_tools:
+        # The cached list may be stale, check once more with the MCP server
+        invalidate_tools_cache()
+        available_tools = await get_available_tools()
     if tool_request.name not in available_tools:
         raise HTTPException(
             status_code=400,
@@ -152,117 +232,160 @@ async def call_mcp_tool(tool_request: ToolRequest) -> Dict[str, Any]:
         )
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{MCP_SERVER_URL}/mcp/tools/{tool_request.name}",
-                json=tool_request.parameters
-            )
-            if response.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"Tool execution failed: {response.text}")
-            return response.json()
+        response = await http_client.post(
+            f"{MCP_SERVER_URL}/mcp/tools/{tool_request.name}",
+            json=tool_request.parameters
+        )
+        if response.status_code == 404:
+            invalidate_tools_cache()
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail=f"Tool execution failed: {response.text}")
+        return orjson.loads(response.content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Tool execution failed: {str(e)}")
 
+async def stream_until_tool_request(messages: List[Dict[str, str]]) -> Tuple[str, Optional[re.Match]]:
+    """Stream an LLM reply, stopping as soon as a complete tool request has arrived.
+
+    Returns the reply text, up to the end of the tool request if there was one,
+    and the tool request match.
+    """
+    stream = await client.chat.completions.create(
+        model=config.model_name,
+        messages=messages,
+        stream=True
+    )
+    parts = []
+    match = None
+    try:
+        async for chunk in stream:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            delta = chunk.choices[0].delta.content
+            parts.append(delta)
+            # A tool request can only have just completed if its closing ">" arrived
+            if ">" in delta:
+                match = _TOOL_REQUEST_RE.search("".join(parts))
+                if match:
+                    break
+    finally:
+        await stream.close()
+
+    text = "".join(parts)
+    if match:
+        text = text[:match.end()]
+    return text, match
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest) -> ChatResponse:
     """Handle chat requests."""
     try:
-        logger.info(f"=== CHAT REQUEST START ===")
-        logger.info(f"Received {len(request.messages)} messages")
-        for i, msg in enumerate(request.messages):
-            logger.info(f"Message {i}: {msg.role} - {msg.content[:100]}...")
+        logger.info("=== CHAT REQUEST START ===")
+        logger.info("Received %d messages", len(request.messages))
         
-        # Convert messages to OpenAI format
-        messages = [{"role": msg.role, "content": msg.content} for msg in request.messages]
+        # Convert messages to OpenAI format, noting whether a system message is present
+        messages = []
+        has_system = False
+        log_messages = logger.isEnabledFor(logging.INFO)
+        for i, msg in enumerate(request.messages):
+            if log_messages:
+                logger.info("Message %d: %s - %s...", i, msg.role, msg.content[:100])
+            messages.append({"role": msg.role, "content": msg.content})
+            has_system = has_system or msg.role == "system"
         
         # Add system message if not present
-        if not any(msg["role"] == "system" for msg in messages):
-            system_prompt = load_system_prompt()
-            logger.info(f"Adding system prompt (length: {len(system_prompt)})")
-            logger.info(f"System prompt preview: {system_prompt[:500]}...")
-            logger.info(f"System prompt contains tool examples: {'<tool_request>' in system_prompt}")
-            logger.info(f"Full system prompt:\n{system_prompt}")
+        if not has_system:
+            logger.info("Adding system prompt (length: %d)", len(SYSTEM_PROMPT))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("System prompt contains tool examples: %s", '<tool_request>' in SYSTEM_PROMPT)
+                logger.debug("Full system prompt:\n%s", SYSTEM_PROMPT)
             messages.insert(0, {
                 "role": "system",
-                "content": system_prompt
+                "content": SYSTEM_PROMPT
             })
         else:
             logger.info("System message already present")
 
-        logger.info(f"Sending {len(messages)} messages to LLM (model: {config.model_name})")
+        logger.info("Sending %d messages to LLM (model: %s)", len(messages), config.model_name)
         
-        # Get response from LLM
-        response = client.chat.completions.create(
-            model=config.model_name,
-            messages=messages
-        )
-        
-        # Extract the response content
-        response_content = response.choices[0].message.content
-        logger.info(f"LLM Response received (length: {len(response_content)})")
-        logger.info(f"LLM Response content: {response_content}")
+        # Get response from LLM, cut short once it asks for a tool
+        response_content, match = await stream_until_tool_request(messages)
+        logger.info("LLM Response received (length: %d)", len(response_content))
+        logger.info("LLM Response content: %s", response_content)
 
         # Check for tool request
-        if "<tool_request>" in response_content:
+        if match:
             logger.info("🔧 Tool request detected in LLM response!")
             # Extract tool request
-            tool_request = response_content.split("<tool_request>")[1].split("</tool_request>")[0]
-            logger.info(f"Extracted tool request: {tool_request}")
+            tool_request = match.group(1)
+            logger.info("Extracted tool request: %s", tool_request)
             
             # Call MCP server
             try:
-                tool_request_data = json.loads(tool_request)
-                tool_name = tool_request_data["name"]
-                tool_parameters = tool_request_data.get("parameters", {})
+                parsed_request = parse_tool_request(tool_request)
                 
-                logger.info(f"Calling MCP server at {MCP_SERVER_URL}/mcp/tools/{tool_name}")
-                async with httpx.AsyncClient() as http_client:
-                    mcp_response = await http_client.post(
-                        f"{MCP_SERVER_URL}/mcp/tools/{tool_name}",
-                        json=tool_parameters
-                    )
-                    if mcp_response.status_code != 200:
-                        tool_response = {"error": f"MCP server error: {mcp_response.text}"}
-                    else:
-                        tool_response = mcp_response.json()
-                    logger.info(f"MCP server response: {tool_response}")
-            except json.JSONDecodeError as e:
-                tool_response = {"error": f"Invalid tool request JSON: {e}"}
-                logger.error(f"Failed to parse tool request: {tool_request}")
+                logger.info("Calling MCP server at %s/mcp/tools/%s", MCP_SERVER_URL, parsed_request.name)
+                mcp_response = await http_client.post(
+                    f"{MCP_SERVER_URL}/mcp/tools/{parsed_request.name}",
+                    json=parsed_request.parameters
+                )
+                if mcp_response.status_code != 200:
+                    tool_response = orjson.dumps({"error": f"MCP server error: {mcp_response.text}"}).decode()
+                else:
+                    # The body is already JSON, so it goes into the prompt as-is
+                    tool_response = mcp_response.text
+                logger.info("MCP server response: %s", tool_response)
+            except ValueError as e:
+                tool_response = orjson.dumps({"error": f"Invalid tool request: {e}"}).decode()
+                logger.error("Failed to parse tool request: %s", tool_request)
 
             # Send follow-up to LLM with tool response
             messages.append({"role": "assistant", "content": response_content})
             messages.append({
                 "role": "user",
-                "content": f"Tool response: {json.dumps(tool_response)}\n\nOriginal question: {request.messages[-1].content}"
+                "content": f"Tool response: {tool_response}\n\nOriginal question: {request.messages[-1].content}"
             })
             
             logger.info("Sending follow-up request to LLM with tool response")
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 model=config.model_name,
                 messages=messages
             )
             response_content = response.choices[0].message.content
-            logger.info(f"Final LLM response: {response_content}")
+            logger.info("Final LLM response: %s", response_content)
         else:
             logger.info("❌ No tool request found in LLM response")
             logger.info("LLM response did not contain <tool_request> tags")
 
-        logger.info(f"=== CHAT REQUEST END ===")
+        logger.info("=== CHAT REQUEST END ===")
         return ChatResponse(response=response_content)
 
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {str(e)}")
-        logger.error(f"Exception details: {type(e).__name__}: {str(e)}")
+        logger.error("Error in chat endpoint: %s", e)
+        logger.error("Exception details: %s: %s", type(e).__name__, e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness endpoint, answers without probing other services."""
+    return {"status": "ok"}
+
 @app.get("/health")
+@ttl_cache(2.0)
 async def health_check():
-    """Health check endpoint."""
+    """Health check endpoint, probing dependent services at most every 2 seconds."""
     health = await check_service_health()
+    # Report check times as ISO strings, formatted once per response
+    services = {
+        name: {
+            "status": state["status"],
+            "last_check": datetime.fromtimestamp(state["last_check"]).isoformat() if state["last_check"] else None
+        }
+        for name, state in health.items()
+    }
     return {
         "status": "healthy" if all(s["status"] == "healthy" for s in health.values()) else "unhealthy",
-        "services": health
+        "services": services
     }
 
 @app.get("/tools")
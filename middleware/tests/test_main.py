@@ -0,0 +1,342 @@
+"""Tests for the chat middleware."""
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+import main  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def tools_cache(monkeypatch):
+    """Start each test with an empty tool list cache."""
+    monkeypatch.setattr(main, "_tools_cache", {"value": None, "expires": 0.0})
+    monkeypatch.setattr(main, "_tools_lock", asyncio.Lock())
+    main.health_check.cache_clear()
+
+
+def _mock_http(monkeypatch, handler):
+    """Point the shared client at a mock transport."""
+    monkeypatch.setattr(main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+def test_client_lifecycle():
+    """The shared client is created on startup and closed on shutdown."""
+    with TestClient(main.app):
+        client = main.http_client
+        assert client is not None
+        assert not client.is_closed
+    assert client.is_closed
+
+
+def test_requests_reuse_shared_client(monkeypatch):
+    """Tool listing and execution go through the shared client."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        if request.url.path == "/mcp/tools":
+            return httpx.Response(200, json=["get_current_time"])
+        return httpx.Response(200, json={"success": True, "output": "now"})
+
+    _mock_http(monkeypatch, handler)
+
+    result = asyncio.run(main.call_mcp_tool(main.ToolRequest(name="get_current_time", parameters={})))
+
+    assert result == {"success": True, "output": "now"}
+    assert requests == [("GET", "/mcp/tools"), ("POST", "/mcp/tools/get_current_time")]
+
+
+def test_health_probes_run_concurrently(monkeypatch):
+    """Both services are probed at once, and a failed probe marks only that service unhealthy."""
+    in_flight = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        in_flight.append(request.url.host)
+        await asyncio.sleep(0.05)
+        assert len(in_flight) == 2
+        if request.url.host == "ollama":
+            raise httpx.ConnectError("down", request=request)
+        return httpx.Response(200, json={"status": "healthy"})
+
+    _mock_http(monkeypatch, handler)
+
+    health = asyncio.run(main.check_service_health())
+
+    assert health["mcp_server"]["status"] == "healthy"
+    assert health["ollama"]["status"] == "unhealthy"
+
+
+def _mock_mcp(monkeypatch, tools, tool_status=200, delay=0):
+    """Mock the MCP server. Returns the list of request paths it received."""
+    paths = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        await asyncio.sleep(delay)
+        if request.url.path == "/mcp/tools":
+            return httpx.Response(200, json=list(tools))
+        return httpx.Response(tool_status, content=b'{"success": true, "output": "noon"}')
+
+    _mock_http(monkeypatch, handler)
+    return paths
+
+
+def test_tools_list_is_cached(monkeypatch):
+    """Concurrent and repeated lookups share one fetch until the TTL expires."""
+    paths = _mock_mcp(monkeypatch, ["t"], delay=0.01)
+
+    async def run():
+        await asyncio.gather(*[main.get_available_tools() for _ in range(5)])
+        await main.get_available_tools()
+
+    asyncio.run(run())
+    assert paths == ["/mcp/tools"]
+
+    main._tools_cache["expires"] = 0.0
+    asyncio.run(main.get_available_tools())
+    assert paths == ["/mcp/tools", "/mcp/tools"]
+
+
+def test_unknown_tool_refetches_list(monkeypatch):
+    """A tool missing from the cached list is checked against a fresh list."""
+    tools = ["old"]
+    paths = _mock_mcp(monkeypatch, tools)
+    asyncio.run(main.get_available_tools())
+    tools.append("new")
+
+    asyncio.run(main.call_mcp_tool(main.ToolRequest(name="new", parameters={})))
+
+    assert paths == ["/mcp/tools", "/mcp/tools", "/mcp/tools/new"]
+
+
+def test_tool_404_invalidates_cache(monkeypatch):
+    """A tool the MCP server no longer knows drops the cached list."""
+    _mock_mcp(monkeypatch, ["t"], tool_status=404)
+
+    with pytest.raises(HTTPException):
+        asyncio.run(main.call_mcp_tool(main.ToolRequest(name="t", parameters={})))
+
+    assert main._tools_cache["expires"] == 0.0
+
+
+def test_extract_tool_request():
+    """The first tagged JSON tool request is parsed, malformed requests are ignored."""
+    text = 'Sure.\n<tool_request>\n{"name": "get_current_time", "parameters": {}}\n</tool_request> done'
+    tool_request = main.extract_tool_request(text)
+    assert tool_request == main.ToolRequest(name="get_current_time", parameters={})
+
+    assert main.extract_tool_request('<tool_request>{"name": "t"}</tool_request>').parameters == {}
+    assert main.extract_tool_request("<tool_request>{oops</tool_request>") is None
+    assert main.extract_tool_request('<tool_request>{"parameters": {}}</tool_request>') is None
+    assert main.extract_tool_request("no tools here") is None
+
+
+class _FakeStream:
+    """Stand-in for an AsyncStream yielding a reply a few characters at a time."""
+
+    def __init__(self, reply, chunk_size=4):
+        self.pieces = [reply[i:i + chunk_size] for i in range(0, len(reply), chunk_size)]
+        self.sent = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.sent == len(self.pieces):
+            raise StopAsyncIteration
+        self.sent += 1
+        delta = SimpleNamespace(content=self.pieces[self.sent - 1])
+        return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeCompletions:
+    """Stand-in for client.chat.completions returning canned replies."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.calls = []
+        self.streams = []
+
+    async def create(self, model, messages, stream=False):
+        self.calls.append([dict(message) for message in messages])
+        reply = self.replies.pop(0)
+        if stream:
+            self.streams.append(_FakeStream(reply))
+            return self.streams[-1]
+        message = SimpleNamespace(content=reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _mock_llm(monkeypatch, replies):
+    """Replace the LLM client. Returns the fake completions recorder."""
+    completions = _FakeCompletions(replies)
+    monkeypatch.setattr(main, "client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    return completions
+
+
+def test_chat_runs_tagged_tool_request(monkeypatch):
+    """A tagged tool request in the LLM reply is run and its result sent back to the LLM."""
+    paths = _mock_mcp(monkeypatch, ["get_current_time"])
+    completions = _mock_llm(monkeypatch, [
+        'Let me check. <tool_request>{"name": "get_current_time", "parameters": {}}</tool_request>',
+        "It is noon.",
+    ])
+
+    request = main.ChatRequest(messages=[main.Message(content="What time is it?")])
+    response = asyncio.run(main.chat(request))
+
+    assert response.response == "It is noon."
+    assert paths == ["/mcp/tools/get_current_time"]
+    assert completions.calls[1][-1]["content"] == (
+        'Tool response: {"success": true, "output": "noon"}\n\nOriginal question: What time is it?'
+    )
+
+
+def test_stream_stops_at_tool_request(monkeypatch):
+    """The reply stream is closed as soon as the tool request is complete."""
+    completions = _mock_llm(monkeypatch, [
+        '<tool_request>{"name": "t", "parameters": {}}</tool_request> and then a long tail of text',
+    ])
+
+    text, match = asyncio.run(main.stream_until_tool_request([]))
+
+    stream = completions.streams[0]
+    assert text == '<tool_request>{"name": "t", "parameters": {}}</tool_request>'
+    assert match.group(1) == '{"name": "t", "parameters": {}}'
+    assert stream.closed
+    assert stream.sent < len(stream.pieces)
+
+
+def test_stream_without_tool_request(monkeypatch):
+    """A reply without a tool request is read to the end."""
+    completions = _mock_llm(monkeypatch, ["Just <b>an</b> answer."])
+
+    text, match = asyncio.run(main.stream_until_tool_request([]))
+
+    assert (text, match) == ("Just <b>an</b> answer.", None)
+    assert completions.streams[0].closed
+
+
+def test_chat_requests_overlap(monkeypatch):
+    """LLM calls are awaited, so concurrent chats wait on the LLM together."""
+    in_flight = []
+
+    class SlowCompletions:
+        async def create(self, model, messages, stream=False):
+            in_flight.append(1)
+            await asyncio.sleep(0.05)
+            assert len(in_flight) == 2
+            return _FakeStream("hi")
+
+    monkeypatch.setattr(main, "client", SimpleNamespace(chat=SimpleNamespace(completions=SlowCompletions())))
+    request = main.ChatRequest(messages=[main.Message(content="hello")])
+
+    async def run():
+        return await asyncio.gather(main.chat(request), main.chat(request))
+
+    assert [response.response for response in asyncio.run(run())] == ["hi", "hi"]
+
+
+def test_chat_uses_loaded_system_prompt(monkeypatch):
+    """The system prompt is loaded once, not read again for each chat."""
+    def fail():
+        raise AssertionError("system prompt read on the request path")
+
+    monkeypatch.setattr(main, "load_system_prompt", fail)
+    monkeypatch.setattr(main, "SYSTEM_PROMPT", "Be brief.")
+    completions = _mock_llm(monkeypatch, ["ok"])
+
+    asyncio.run(main.chat(main.ChatRequest(messages=[main.Message(content="hi")])))
+
+    assert completions.calls[0][0] == {"role": "system", "content": "Be brief."}
+
+
+def test_client_timeouts():
+    """The shared client fails fast on connect and pool waits."""
+    with TestClient(main.app):
+        assert main.http_client.timeout == httpx.Timeout(connect=2.0, read=10.0, write=5.0, pool=1.0)
+
+
+def test_health_reports_iso_check_times(monkeypatch):
+    """Check times are stored as epoch seconds and reported as ISO strings."""
+    _mock_http(monkeypatch, lambda request: httpx.Response(200, json={}))
+    monkeypatch.setattr(main.time, "time", lambda: 1_700_000_000.0)
+
+    health = asyncio.run(main.health_check())
+
+    assert main.health_state["ollama"]["last_check"] == 1_700_000_000.0
+    assert health["status"] == "healthy"
+    assert health["services"]["ollama"]["last_check"] == datetime.fromtimestamp(1_700_000_000.0).isoformat()
+
+
+def test_chat_keeps_client_system_message(monkeypatch):
+    """A system message from the client is kept and no default prompt is added."""
+    completions = _mock_llm(monkeypatch, ["ok"])
+    history = [
+        main.Message(role="user", content="hi"),
+        main.Message(role="system", content="Custom."),
+        main.Message(role="user", content="again"),
+    ]
+
+    asyncio.run(main.chat(main.ChatRequest(messages=history)))
+
+    assert completions.calls[0] == [{"role": m.role, "content": m.content} for m in history]
+
+
+def test_chat_reports_invalid_tool_request(monkeypatch):
+    """A tool request without a name is reported back to the LLM instead of failing the chat."""
+    paths = _mock_mcp(monkeypatch, [])
+    completions = _mock_llm(monkeypatch, [
+        '<tool_request>{"parameters": {}}</tool_request>',
+        "Sorry.",
+    ])
+
+    response = asyncio.run(main.chat(main.ChatRequest(messages=[main.Message(content="hi")])))
+
+    assert response.response == "Sorry."
+    assert paths == []
+    assert completions.calls[1][-1]["content"].startswith('Tool response: {"error":"Invalid tool request:')
+
+
+def test_health_is_cached_briefly(monkeypatch):
+    """Health probes are reused for bursts of /health requests."""
+    probes = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        probes.append(request.url.host)
+        return httpx.Response(200, json={})
+
+    _mock_http(monkeypatch, handler)
+
+    async def run():
+        await asyncio.gather(*[main.health_check() for _ in range(3)])
+        await main.health_check()
+
+    asyncio.run(run())
+    assert sorted(probes) == ["mcp-server", "ollama"]
+
+    main.health_check.cache_clear()
+    asyncio.run(main.health_check())
+    assert len(probes) == 4
+
+
+def test_liveness_does_not_probe(monkeypatch):
+    """The liveness endpoint answers without calling other services."""
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise AssertionError("liveness probed a service")
+
+    with TestClient(main.app) as client:
+        _mock_http(monkeypatch, handler)
+        assert client.get("/health/live").json() == {"status": "ok"}
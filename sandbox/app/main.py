@@ -1,13 +1,15 @@
 """Pure code execution sandbox."""
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, constr
-import subprocess
+from worker import FRAME_HEADER
+import asyncio
+import json
 import os
 from pathlib import Path
 import re
 import uvicorn
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import sys
 
 # Configure logging
@@ -22,21 +24,38 @@ app = FastAPI(title="Code Execution Sandbox")
 
 WORKSPACE_DIR = Path("/app/workspace")
 
+# Persistent interpreter that runs submitted code
+WORKER_SCRIPT = Path(__file__).resolve().with_name("worker.py")
+
+# Maximum time a single snippet may run before its worker is restarted
+EXECUTION_TIMEOUT = 5.0
+
+# Number of workers running batches in parallel
+WORKER_POOL_SIZE = os.cpu_count() or 1
+
+# Concurrent snippets are grouped into one worker round-trip
+BATCH_MAX_SIZE = 8
+BATCH_MAX_DELAY = 0.05
+
+# Maximum time a pip install may take
+PIP_TIMEOUT = 60
+
 # Package name validation regex
-PACKAGE_NAME_PATTERN = re.compile(r'^[a-zA-Z0-9\-_\.]+$')
+PACKAGE_NAME_PATTERN = re.compile(r'[a-zA-Z0-9\-_\.]+')
+MAX_PACKAGE_NAME_LENGTH = 100
 
-# Known malicious or problematic packages
-BLOCKED_PACKAGES = {
+# Known malicious or problematic packages, lowercase
+BLOCKED_PACKAGES = frozenset({
     'crypto-locker',
     'pythonapi',
     'python-api',
     'system',
     'snake',
     # Add more as needed
-}
+})
 
-# Packages that require extra scrutiny
-SUSPICIOUS_PACKAGES = {
+# Packages that require extra scrutiny, lowercase
+SUSPICIOUS_PACKAGES = frozenset({
     'cryptography',
     'crypto',
     'requests',
@@ -44,13 +63,13 @@ SUSPICIOUS_PACKAGES = {
     'socket',
     'subprocess',
     # Add more as needed
-}
+})
 
 class CodeRequest(BaseModel):
     code: str
 
 class PipRequest(BaseModel):
-    package: constr(min_length=1, max_length=100)  # Constrain package name length
+    package: constr(min_length=1, max_length=MAX_PACKAGE_NAME_LENGTH)  # Constrain package name length
     version: str = "latest"
 
 class CodeResponse(BaseModel):
@@ -58,15 +77,161 @@ class CodeResponse(BaseModel):
     output: str = ""
     error: str = ""
 
+class CodeWorker:
+    """Long-lived Python subprocess that executes code snippets.
+    
+    Keeps interpreter startup and the numpy import off the request path. Each
+    round-trip runs a batch of snippets one after another, each in its own
+    namespace; a batch that runs past its timeout kills the worker and a fresh
+    one is started for the next batch.
+    """
+    
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._proc: Optional[asyncio.subprocess.Process] = None
+    
+    async def start(self):
+        """Start a new worker process."""
+        # stderr is inherited so stray output goes to the container log instead of filling a pipe
+        self._proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-u", str(WORKER_SCRIPT),
+            cwd=str(WORKSPACE_DIR),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE
+        )
+    
+    async def close(self):
+        """Stop the worker process."""
+        if self._proc is None:
+            return
+        if self._proc.returncode is None:
+            self._proc.kill()
+        await self._proc.wait()
+    
+    async def _roundtrip(self, codes: List[str]) -> List[Dict[str, Any]]:
+        """Send a batch of snippets to the worker and wait for their results."""
+        blob = json.dumps(codes).encode("utf-8")
+        self._proc.stdin.write(FRAME_HEADER.pack(len(blob)) + blob)
+        await self._proc.stdin.drain()
+        
+        try:
+            header = await self._proc.stdout.readexactly(FRAME_HEADER.size)
+            (size,) = FRAME_HEADER.unpack(header)
+            return json.loads(await self._proc.stdout.readexactly(size))
+        except asyncio.IncompleteReadError:
+            raise RuntimeError("Code worker exited unexpectedly")
+    
+    async def execute(self, codes: List[str]) -> List[Dict[str, Any]]:
+        """Execute snippets in the worker, restarting it if it times out or dies."""
+        async with self._lock:
+            if self._proc is None or self._proc.returncode is not None:
+                await self.start()
+            
+            try:
+                return await asyncio.wait_for(
+                    self._roundtrip(codes),
+                    timeout=EXECUTION_TIMEOUT * len(codes)
+                )
+            except BaseException:
+                # The worker is stuck or gone, the next snippet gets a fresh one
+                await self.close()
+                raise
+
+class DynBatcher:
+    """Groups concurrently submitted snippets into worker round-trips.
+    
+    A batch is opened once a worker is idle and a snippet is pending, and collects
+    further submissions for up to max_delay seconds or until max_batch_size
+    snippets are waiting. Batches run in parallel, one per idle worker; while all
+    workers are busy new snippets queue up for the next batch.
+    """
+    
+    def __init__(self, workers: List[CodeWorker], max_batch_size: int = BATCH_MAX_SIZE, max_delay: float = BATCH_MAX_DELAY):
+        self._max_batch_size = max_batch_size
+        self._max_delay = max_delay
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for worker in workers:
+            self._idle.put_nowait(worker)
+        self._task: Optional[asyncio.Task] = None
+        self._batches: set = set()
+    
+    def start(self):
+        """Start dispatching batches."""
+        self._task = asyncio.create_task(self._run())
+    
+    async def close(self):
+        """Stop dispatching batches, cancelling the ones still running."""
+        tasks = list(self._batches)
+        if self._task is not None:
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def submit(self, code: str) -> Dict[str, Any]:
+        """Queue a snippet and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((code, future))
+        return await future
+    
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        """Wait for the next batch of pending snippets."""
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._max_delay
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _run(self):
+        """Dispatch batches to idle workers until cancelled."""
+        while True:
+            worker = await self._idle.get()
+            # Skip snippets whose callers already gave up
+            batch = []
+            while not batch:
+                batch = [(code, future) for code, future in await self._collect() if not future.done()]
+            
+            task = asyncio.create_task(self._dispatch(worker, batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+    
+    async def _dispatch(self, worker: CodeWorker, batch: List[Tuple[str, asyncio.Future]]):
+        """Run one batch on a worker and hand the worker back when done."""
+        try:
+            results = await worker.execute([code for code, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._idle.put_nowait(worker)
+        
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+code_workers: List[CodeWorker] = []
+code_batcher: Optional[DynBatcher] = None
+
 def validate_package_name(package: str) -> bool:
     """Validate package name against security rules."""
-    if package.lower() in BLOCKED_PACKAGES:
+    name = package.lower()
+    if name in BLOCKED_PACKAGES:
         raise HTTPException(status_code=400, detail=f"Package {package} is blocked for security reasons")
     
-    if not PACKAGE_NAME_PATTERN.match(package):
+    if len(package) > MAX_PACKAGE_NAME_LENGTH or not PACKAGE_NAME_PATTERN.fullmatch(package):
         raise HTTPException(status_code=400, detail="Invalid package name format")
     
-    if package.lower() in SUSPICIOUS_PACKAGES:
+    if name in SUSPICIOUS_PACKAGES:
         raise HTTPException(status_code=400, detail=f"Package {package} requires administrative approval")
     
     return True
@@ -83,30 +248,16 @@ async def execute_code(request: CodeRequest):
         Dict containing execution results or error information
     """
     try:
-        # Create a temporary file in the workspace
-        workspace_dir = "/app/workspace"
-        os.makedirs(workspace_dir, exist_ok=True)
-        
-        # Execute the code
+        # Execute the code in a persistent worker, it is sent over the pipe so nothing touches disk
         logger.info(f"Executing code in sandbox")
-        result = {}
-        
-        # Create a new namespace for execution
-        namespace = {}
-        
-        # Execute the code
-        exec(request.code, namespace)
-        
-        # Get any output variables
-        for key, value in namespace.items():
-            if not key.startswith('__'):
-                result[key] = str(value)
+        return await code_batcher.submit(request.code)
         
+    except asyncio.TimeoutError:
+        logger.error(f"Code execution timed out after {EXECUTION_TIMEOUT} seconds")
         return {
-            "status": "success",
-            "result": result
+            "status": "error",
+            "error": f"Execution timed out after {EXECUTION_TIMEOUT} seconds"
         }
-        
     except Exception as e:
         logger.error(f"Error executing code: {str(e)}")
         return {
@@ -114,6 +265,23 @@ async def execute_code(request: CodeRequest):
             "error": str(e)
         }
 
+@app.on_event("startup")
+async def startup_event():
+    """Create the workspace and start the code execution workers."""
+    global code_workers, code_batcher
+    WORKSPACE_DIR.mkdir(parents=True, exist_ok=True)
+    code_workers = [CodeWorker() for _ in range(WORKER_POOL_SIZE)]
+    await asyncio.gather(*[worker.start() for worker in code_workers])
+    code_batcher = DynBatcher(code_workers)
+    code_batcher.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the code execution workers."""
+    if code_batcher is not None:
+        await code_batcher.close()
+    await asyncio.gather(*[worker.close() for worker in code_workers])
+
 @app.post("/pip/install", response_model=CodeResponse)
 async def pip_install(request: PipRequest):
     try:
@@ -127,18 +295,23 @@ async def pip_install(request: PipRequest):
         else:
             pip_cmd.append(request.package)
 
-        # Run pip install
-        process = subprocess.run(
-            pip_cmd,
-            capture_output=True,
-            text=True,
-            timeout=60  # 1 minute timeout for pip
+        # Run pip install without blocking the event loop
+        process = await asyncio.create_subprocess_exec(
+            *pip_cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
         )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=PIP_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise RuntimeError(f"pip install timed out after {PIP_TIMEOUT} seconds")
 
         return CodeResponse(
             success=process.returncode == 0,
-            output=process.stdout,
-            error=process.stderr
+            output=stdout.decode(),
+            error=stderr.decode()
         )
 
     except Exception as e:
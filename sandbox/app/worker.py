@@ -0,0 +1,72 @@
+"""Persistent code execution worker for the sandbox.
+
+Reads length-prefixed JSON batches of code snippets from stdin, executes each
+snippet in a fresh namespace and writes back a length-prefixed JSON list of
+results in the same order.
+"""
+import contextlib
+import io
+import json
+import os
+import struct
+import sys
+
+# Frame header: big-endian unsigned 32-bit payload length
+FRAME_HEADER = struct.Struct("!I")
+
+def run_code(code: str) -> dict:
+    """Execute code in a fresh namespace and collect its results."""
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    namespace = {}
+
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            exec(code, namespace)
+
+        # Get any output variables
+        result = {}
+        for key, value in namespace.items():
+            if not key.startswith('__'):
+                result[key] = str(value)
+
+        return {
+            "status": "success",
+            "result": result,
+            "output": stdout.getvalue(),
+            "stderr": stderr.getvalue()
+        }
+    except BaseException as e:
+        return {
+            "status": "error",
+            "error": str(e),
+            "output": stdout.getvalue(),
+            "stderr": stderr.getvalue()
+        }
+
+def main():
+    """Serve execution requests until stdin is closed."""
+    # Pre-import numpy so snippets that use it skip the import cost
+    import numpy  # noqa: F401
+
+    # Keep the protocol streams private so executed code can't read or corrupt them
+    reader = os.fdopen(os.dup(sys.stdin.fileno()), "rb")
+    writer = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, sys.stdin.fileno())
+    os.close(devnull)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    while True:
+        header = reader.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            return
+        (size,) = FRAME_HEADER.unpack(header)
+        codes = json.loads(reader.read(size))
+
+        payload = json.dumps([run_code(code) for code in codes]).encode("utf-8")
+        writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+        writer.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Tests for the code execution sandbox."""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+import main  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def workspace(tmp_path, monkeypatch):
+    """Run the worker in a temporary workspace."""
+    monkeypatch.setattr(main, "WORKSPACE_DIR", tmp_path / "workspace")
+    monkeypatch.setattr(main, "WORKER_POOL_SIZE", 2)
+    return tmp_path / "workspace"
+
+
+def _execute(client, code):
+    return client.post("/execute", json={"code": code}).json()
+
+
+def test_execute_returns_variables_and_output():
+    """Variables and printed output are returned from the worker."""
+    with TestClient(main.app) as client:
+        result = _execute(client, "print('hi')\nx = 2 + 2")
+    assert result["status"] == "success"
+    assert result["result"] == {"x": "4"}
+    assert result["output"] == "hi\n"
+
+
+def test_execute_uses_fresh_namespace():
+    """Each snippet runs in its own namespace on the same worker."""
+    with TestClient(main.app) as client:
+        _execute(client, "x = 1")
+        result = _execute(client, "y = 'x' in globals()")
+    assert result["result"] == {"y": "False"}
+
+
+def test_execute_reports_errors():
+    """Exceptions, including SystemExit, come back as errors without killing the worker."""
+    with TestClient(main.app) as client:
+        assert _execute(client, "1 / 0") == {
+            "status": "error", "error": "division by zero", "output": "", "stderr": ""
+        }
+        assert _execute(client, "raise SystemExit('bye')")["error"] == "bye"
+        assert _execute(client, "x = 1")["status"] == "success"
+
+
+def test_execute_timeout_restarts_worker(monkeypatch):
+    """A snippet that runs too long is killed and the next one still runs."""
+    monkeypatch.setattr(main, "EXECUTION_TIMEOUT", 0.5)
+    with TestClient(main.app) as client:
+        result = _execute(client, "while True: pass")
+        assert result["status"] == "error"
+        assert "timed out" in result["error"]
+        assert _execute(client, "x = 1")["result"] == {"x": "1"}
+
+
+def test_execute_runs_in_workspace(workspace):
+    """Snippets run with the workspace as their working directory."""
+    with TestClient(main.app) as client:
+        result = _execute(client, "import os\ncwd = os.getcwd()")
+    assert result["result"]["cwd"] == str(workspace)
+
+
+def test_execute_does_not_write_code_to_disk(workspace):
+    """Snippets reach the worker over its pipe, leaving the workspace untouched."""
+    with TestClient(main.app) as client:
+        _execute(client, "x = 1")
+        _execute(client, "y = 2")
+    assert list(workspace.iterdir()) == []
+
+
+def test_concurrent_snippets_share_a_round_trip(workspace):
+    """Snippets submitted together run in one worker round-trip with separate namespaces."""
+    async def run():
+        main.WORKSPACE_DIR.mkdir(parents=True)
+        worker = main.CodeWorker()
+        await worker.start()
+        batches = []
+        execute = worker.execute
+
+        async def counting_execute(codes):
+            batches.append(len(codes))
+            return await execute(codes)
+
+        worker.execute = counting_execute
+        batcher = main.DynBatcher([worker])
+        batcher.start()
+        try:
+            return batches, await asyncio.gather(*[batcher.submit(f"x = {i}") for i in range(5)])
+        finally:
+            await batcher.close()
+            await worker.close()
+
+    batches, results = asyncio.run(run())
+    assert batches == [5]
+    assert [result["result"] for result in results] == [{"x": str(i)} for i in range(5)]
+
+
+def test_batches_run_in_parallel_on_pool(workspace):
+    """Batches that don't fit one worker run at the same time on other workers."""
+    async def run():
+        main.WORKSPACE_DIR.mkdir(parents=True)
+        workers = [main.CodeWorker(), main.CodeWorker()]
+        await asyncio.gather(*[worker.start() for worker in workers])
+        batcher = main.DynBatcher(workers, max_batch_size=1)
+        batcher.start()
+        try:
+            code = "import os, time\ntime.sleep(0.5)\npid = os.getpid()"
+            start = time.monotonic()
+            results = await asyncio.gather(batcher.submit(code), batcher.submit(code))
+            return time.monotonic() - start, results
+        finally:
+            await batcher.close()
+            await asyncio.gather(*[worker.close() for worker in workers])
+
+    elapsed, results = asyncio.run(run())
+    assert elapsed < 0.9
+    assert results[0]["result"]["pid"] != results[1]["result"]["pid"]
+
+
+@pytest.mark.parametrize("package, detail", [
+    ("Crypto-Locker", "blocked"),
+    ("Requests", "administrative approval"),
+    ("numpy\n", "Invalid package name format"),
+    ("numpy; rm", "Invalid package name format"),
+    ("a" * 101, "Invalid package name format"),
+])
+def test_validate_package_name_rejects(package, detail):
+    """Blocked, suspicious and malformed names are rejected, ignoring case."""
+    with pytest.raises(main.HTTPException) as excinfo:
+        main.validate_package_name(package)
+    assert excinfo.value.status_code == 400
+    assert detail in excinfo.value.detail
+
+
+def test_validate_package_name_accepts():
+    """Ordinary package names pass."""
+    assert main.validate_package_name("scikit-learn")
@@ -3,6 +3,7 @@ from fastapi import FastAPI
 from fastapi_mcp import FastApiMCP
 from datetime import datetime, timezone
 import logging
+import time
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -11,16 +12,31 @@ logger = logging.getLogger(__name__)
 # Initialize FastAPI app
 app = FastAPI(title="Time Tool")
 
+# Pre-bound lookups for the time tool hot path
+_utc = timezone.utc
+_fromtimestamp = datetime.fromtimestamp
+
+# Last formatted time and the second it was computed in
+_last_ts = 0
+_last_result = ""
+
 @app.get("/current-time", operation_id="get_current_time", summary="Get the current time in UTC format")
 async def get_current_time() -> str:
     """Get the current time in UTC format.
     
+    The formatted string only changes once a minute, so it is reused for calls
+    within the same second, and only a newly formatted time is logged.
+    
     Returns:
         Current time in yyyy-mm-dd HH:MM UTC format
     """
-    current_time = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
-    logger.info(f"Time tool returning: {current_time}")
-    return current_time
+    global _last_ts, _last_result
+    ts = time.time_ns() // 1_000_000_000
+    if ts != _last_ts:
+        _last_result = _fromtimestamp(ts, _utc).strftime("%Y-%m-%d %H:%M UTC")
+        _last_ts = ts
+        logger.info(f"Time tool returning: {_last_result}")
+    return _last_result
 
 @app.get("/health")
 async def health_check():
@@ -29,4 +45,4 @@ async def health_check():
 
 # Initialize FastAPI-MCP and mount it
 mcp = FastApiMCP(app)
-mcp.mount() 
\ No newline at end of file
+mcp.mount()
@@ -0,0 +1,33 @@
+"""Tests for the time tool."""
+import re
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+import main  # noqa: E402
+
+
+def test_current_time_format():
+    """The time is returned as yyyy-mm-dd HH:MM UTC."""
+    with TestClient(main.app) as client:
+        response = client.get("/current-time")
+    assert re.fullmatch(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2} UTC", response.json())
+
+
+def test_current_time_reused_within_second(monkeypatch):
+    """Calls in the same second reuse the formatted string."""
+    monkeypatch.setattr(main.time, "time_ns", lambda: 1_700_000_000_500_000_000)
+    monkeypatch.setattr(main, "_last_ts", 1_700_000_000)
+    monkeypatch.setattr(main, "_last_result", "cached")
+    with TestClient(main.app) as client:
+        assert client.get("/current-time").json() == "cached"
+
+
+def test_current_time_formats_same_timestamp(monkeypatch):
+    """A new second is formatted from the timestamp it was detected with."""
+    monkeypatch.setattr(main.time, "time_ns", lambda: 1_700_000_039_999_999_999)
+    with TestClient(main.app) as client:
+        assert client.get("/current-time").json() == "2023-11-14 22:13 UTC"
+    assert main._last_ts == 1_700_000_039